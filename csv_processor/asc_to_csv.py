@@ -1,17 +1,29 @@
+import glob  # escaping of file name patterns
 import json  # JavaScript Object Notation for metadata file
 import logging  # log events (more functionality than print())
 import math  # pi etc.
+import os  # atomic file replacement
 import re  # regular expressions
-# from collections import defaultdict
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor  # parallel file reading
 from datetime import datetime
+from functools import partial, singledispatch
 from pathlib import Path
 
-import dateutil  # date parsing
+import dateutil.parser  # date parsing (fallback for unknown formats)
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend; we only save to files
 import matplotlib.pyplot as plt  # plotting
+import numpy  # arrays (memory layout)
 import pandas  # Data processing
 import pytz  # timezone
 from matplotlib.backends.backend_pdf import PdfPages
 
+try:  # Optional: caching of parsed input files as Parquet
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 
 logging.basicConfig(
     filename="out.log",
@@ -22,140 +34,240 @@ logging.basicConfig(
 )
 
 
+@singledispatch
 def value_cleanup(raw_in) -> float:
     """
     Turn dirtied string(s) (e.g. ",233 kg") to float(s).
     Apply int(value_cleanup()) if you want to turn this function's output
     into an integer again, in case it came out as float.
+    The implementation is picked by the input's type (see the registered
+    functions below); anything not registered is rejected.
     """
-    # If input is already 'clean', i.e. an integer, float or datetime object,
-    # don't manipulate it:
-    if isinstance(raw_in, (int, float, datetime)) or raw_in is None:
-        return raw_in
-    # If input is a list of dirtied strings, we return a list of cleaned output.
-    # This also works on arbitrarily nested lists (recursion):
-    elif isinstance(raw_in, list):
-        return [value_cleanup(dirtied_string) for dirtied_string in raw_in]
-    # If input is a dictionary, clean up the values and leave the keys:
-    elif isinstance(raw_in, dict):
-        return {k: value_cleanup(v) for k, v in raw_in.items()}
-    # Before finally working on the string, filter out anything that hasn't been
-    # filtered yet.
-    elif not isinstance(raw_in, str):
-        raise TypeError(f"Expected string, got '{type(raw_in).__name__}'.")
+    raise TypeError(f"Expected string, got '{type(raw_in).__name__}'.")
+
+
+# If input is already 'clean', i.e. an integer, float or datetime object,
+# don't manipulate it:
+@value_cleanup.register(int)
+@value_cleanup.register(float)
+@value_cleanup.register(datetime)
+@value_cleanup.register(type(None))
+def _(raw_in):
+    return raw_in
+
+
+# If input is a list of dirtied strings, we return a list of cleaned output.
+# This also works on arbitrarily nested lists (recursion):
+@value_cleanup.register(list)
+def _(raw_in):
+    return [value_cleanup(dirtied_string) for dirtied_string in raw_in]
+
+
+# If input is a dictionary, clean up the values and leave the keys:
+@value_cleanup.register(dict)
+def _(raw_in):
+    return {k: value_cleanup(v) for k, v in raw_in.items()}
+
+
+# Finally, work on the actual dirtied string:
+@value_cleanup.register(str)
+def _(raw_in):
+    decimal_sep = "."  # Proper decimal separator for Python
+    # Fix decimal representation for European data:
+    dotted = raw_in.replace(",", decimal_sep)
+
+    stripped = dotted.strip()  # Remove surrounding whitespace
+    numeric = "-0123456789" + decimal_sep  # Include negatives/decimal sep.
+    position = None  # Initialize to throw error just in case
+    # Append space for search to work
+    for position, char in enumerate(stripped + " "):
+        if char not in numeric:
+            if position == 0:  # Didn't even start with numerical char
+                return None
+            break
+    # When no decimal separator is found in the original (either "," or ".")
+    # it should be handled as an integer.
+    # Get cleaned-up string up until the position found for the first
+    # non-numeric character:
+    cleaned = stripped[:position]
+    if not decimal_sep in cleaned:
+        final_value = int(cleaned)
     else:
-        decimal_sep = "."  # Proper decimal separator for Python
-        # Fix decimal representation for European data:
-        dotted = raw_in.replace(",", decimal_sep)
-
-        stripped = dotted.strip()  # Remove surrounding whitespace
-        numeric = "-0123456789" + decimal_sep  # Include negatives/decimal sep.
-        position = None  # Initialize to throw error just in case
-        # Append space for search to work
-        for position, char in enumerate(stripped + " "):
-            if char not in numeric:
-                if position == 0:  # Didn't even start with numerical char
-                    return None
-                break
-        # When no decimal separator is found in the original (either "," or ".")
-        # it should be handled as an integer.
-        # Get cleaned-up string up until the position found for the first
-        # non-numeric character:
-        cleaned = stripped[:position]
-        if not decimal_sep in cleaned:
-            final_value = int(cleaned)
-        else:
-            final_value = float(cleaned)
+        final_value = float(cleaned)
 
-        logging.info(f"Turned {type(raw_in).__name__} '{raw_in}' into "
-                     f"{type(final_value).__name__} '{final_value}'.")
-        return final_value
+    logging.info(f"Turned {type(raw_in).__name__} '{raw_in}' into "
+                 f"{type(final_value).__name__} '{final_value}'.")
+    return final_value
 
 
-def get_metadata(table, data_start: int) -> dict:
+def parse_date(raw_date: str) -> datetime:
     """
-    Take in a table file handle and extract the meta-info found in the file
-    header, put into dictionary. After the header, the column names, i.e.
-    row of column header names follows; return its index so we know from
-    where to look for data rows.
+    Turn a date string from a file header into a datetime object.
+    Try the known formats first (fast, explicit), then let dateutil guess.
     """
-    metadata = {}  # metadata found in file header
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(raw_date, date_format)
+        except ValueError:
+            continue  # Try next format
+    logging.warning(f"Date '{raw_date}' has unknown format, guessing it.")
+    return dateutil.parser.parse(raw_date)
 
-    for i, row in enumerate(table):
-        if i >= data_start:
-            break  # Do not look for header beyond where data already started
-        lrow = row.lower()
-
-        def get_entry(x):
-            return x.split(":", 1)[-1].strip()  # part after colon
-
-        # This if/elif/... aka switch/case cascade should ideally be solved
-        # using a dictionary, however the individual cases are treated so
-        # differently that a lot of manual adjustment is necessary.
-        if "software" in lrow:
-            metadata["generated_by"] = row.strip()
-        elif "aufgenommen" in lrow:
-            date = dateutil.parser.parse(get_entry(row))
-            metadata["date_recorded"] = tz.localize(date)
-        elif "blocklaenge" in lrow:
-            metadata["block_length"] = value_cleanup(get_entry(row))
-        elif "delta" in lrow:
-            metadata["delta/s"] = value_cleanup(get_entry(row))
-        elif "kanalzahl" in lrow:
-            metadata["channel_count"] = value_cleanup(get_entry(row))
-        elif "oil" in lrow:
-            metadata.setdefault("oils", []).append(get_entry(row))
-        elif "elastomer" in lrow:
-            metadata.setdefault("elastomers", []).append(get_entry(row))
-        elif "welle" in lrow:
-            metadata.setdefault("shafts", []).append(get_entry(row))
-        elif "versuchsname" in lrow:
-            metadata["name"] = get_entry(row)
-        elif "versuchsstand" in lrow:
-            metadata["station"] = value_cleanup(get_entry(row))
-        elif "kalibriergew" in lrow:
-            metadata.setdefault("cal_weights/kg", []).append(
-                value_cleanup(get_entry(row)))
-        elif "tariergew" in lrow:
-            metadata.setdefault("tar_weights_frac", []).append(
-                value_cleanup(get_entry(row))
-                * 100 / 100 ** 2  # 0.0000, avoiding float arithmetic
-            )
 
-    # Call strftime three time so that .join()-delimiter also applies to them:
-    metadata["experiment_id"] = "_".join(
-        [metadata.get("date_recorded").strftime("%Y"),
-         metadata.get("date_recorded").strftime("%m"),
-         metadata.get("date_recorded").strftime("%d"),
-         str(metadata.get("name")), "T" + str(metadata.get("station"))]
+def header_entry(row: str) -> str:
+    """Get the part after the colon of a 'key: value' file header row."""
+    return row.split(":", 1)[-1].strip()
+
+
+def get_metadata(header: list, origin: str) -> dict:
+    """
+    Take in the header rows of a table file, i.e. all rows before the row of
+    column header names, and extract the meta-info found in them, put into
+    dictionary.
+    """
+    metadata = {}  # metadata found in file header
+
+    # First, sort the rows by the keyword they carry...
+    keyword_rows = defaultdict(list)
+    for row in header:
+        # Leftmost keyword decides, so that keywords occurring in an entry's
+        # value (e.g. "Elastomer 1: Oil-resistant") do not take precedence:
+        match = header_keyword_pattern.search(row)
+        if match is not None:  # Else, row carries no metadata we know of
+            keyword_rows[match.group(0).lower()].append(row)
+
+    # ...then convert all rows of a keyword in one go:
+    for keyword, rows in keyword_rows.items():
+        key, convert, collect = header_keywords[keyword]
+        if collect:  # Entry can occur multiple times, e.g. "Oil 1", "Oil 2"
+            metadata[key] = [convert(row) for row in rows]
+        else:  # Last occurrence wins
+            metadata[key] = convert(rows[-1])
+
+    # E.g. "2019_02_22_ABC_2_XY_T14"; name and station may be missing (None):
+    date = metadata.get("date_recorded")
+    metadata["experiment_id"] = (
+        f"{date.year:04d}_{date.month:02d}_{date.day:02d}_"
+        f"{metadata.get('name')}_T{metadata.get('station')}"
     )
 
     metadata["diameter/m"] = 0.04297  # meter; hardcoded, doesn't change (?)
 
-    metadata["data_origin"] = table.name  # mainly for debugging
+    metadata["data_origin"] = origin  # mainly for debugging
     return metadata
 
 
+def read_table(
+    file: Path, table_delimiter: str, cache_dir: Path = None
+) -> tuple:
+    """
+    Read in a table file. Return its header rows, i.e. all rows before the row
+    of column header names (they contain the metadata), and its data as a
+    dataframe. The file is opened only once: the header rows are kept, and
+    pandas reads from the same, rewound file handle.
+    If a cache directory is given (requires pyarrow), parsed data is saved
+    there as Parquet and loaded again on later runs, as long as the file's
+    modification time and size are unchanged.
+    """
+    logging.info(f"Starting work on file '{file.name}'.".upper())
+
+    # Get header row aka data start. This runs once for each file,
+    # even if they share the same data start column (safe approach).
+    # Binary with a large buffer: only the header rows are decoded here,
+    # pandas decodes the data itself (in C), and large files take fewer reads.
+    with open(file, "rb", buffering=1 << 20) as spreadsheet:  # 1 MiB buffer
+        header_rows = []  # All rows before the column header row
+        for table_index, raw_row in enumerate(spreadsheet):
+            row_content = raw_row.decode(table_encoding)
+            lrow = row_content.lower()
+            # Find column header row/data start based on these criteria:
+            if "datum" in lrow and lrow.count(table_delimiter) > 1:
+                logging.info("Found the column header in row "
+                             f"{table_index + 1} of '{file.name}'.")
+                # Dismiss remaining rows after header.
+                # At this point, table_index corresponds to the row
+                # index where data starts/column header is found.
+                break
+            header_rows.append(row_content)
+
+        if cache_dir is not None:
+            stat = file.stat()
+            cache_file = cache_dir.joinpath(
+                f"{file.parent.name}.{file.stem}."
+                f"{stat.st_mtime_ns}.{stat.st_size}.parquet"
+            )
+            if cache_file.exists():
+                logging.info(f"Loading cached dataframe for '{file.name}' "
+                             f"from '{cache_file}'.")
+                return header_rows, pandas.read_parquet(cache_file)
+
+        # After filtering out the unwanted files, we must have found a
+        # proper one. Turn it into a new dataframe:
+        logging.info(f"Turning file '{file.name}' into pandas dataframe.")
+        spreadsheet.seek(0)
+        dataframe = csv_to_dataframe(spreadsheet, table_index, table_delimiter)
+        logging.info(f"Turned file '{file.name}' into pandas dataframe.")
+
+    if cache_dir is not None:
+        # Write to a temporary file first, then replace in one step: a crash
+        # midway must not leave a truncated cache file for later runs to load.
+        temporary_file = cache_file.with_name(cache_file.name + ".tmp")
+        dataframe.to_parquet(temporary_file, compression="zstd")
+        os.replace(temporary_file, cache_file)
+        logging.info(f"Cached dataframe for '{file.name}' in '{cache_file}'.")
+
+        # Entries for earlier versions of this file can never be loaded again.
+        # Other files' stems may start with this one's, so check the rest too:
+        prefix = f"{file.parent.name}.{file.stem}."
+        for old_file in cache_dir.glob(glob.escape(prefix) + "*.parquet"):
+            version = old_file.name[len(prefix):]
+            if (old_file != cache_file
+                    and re.fullmatch(r"\d+\.\d+\.parquet", version)):
+                old_file.unlink()
+                logging.info(f"Removed outdated cache file '{old_file}'.")
+    return header_rows, dataframe
+
+
+def index_by_time(dataframe):
+    """
+    Replace the date and time columns of a freshly read table by a datetime
+    index, parsed from them.
+    """
+    # Explicit format, so that any deviation raises instead of being guessed:
+    dataframe.index = pandas.to_datetime(
+        dataframe.pop("Datum") + " " + dataframe.pop("Uhrzeit"),
+        format=timestamp_format,
+        cache=True  # Dates repeat a lot
+    )
+    dataframe.index.name = "Time"
+    return dataframe
+
+
 def csv_to_dataframe(table_file, table_data_start: int, table_delimiter: str):
     """
     Read in CSV; does not have to literally be a *.csv-file, just a text file
     with columns separated by some delimiter and of course some rows.
     Generating the DF, parsing the date and creating and index from it takes
-    a lot of time. This is the script's bottleneck. It could be done
-    differently, but this approach is very simple, robust (not hacky), easy to
-    maintain and will stay valid for years to come.
+    a lot of time. This is the script's bottleneck. Therefore, the date and
+    time columns are read as plain strings and parsed afterwards in one go,
+    using their known format instead of letting pandas infer it cell by cell.
     Once the index is built, our reward is that any operations based on it are
     incredibly fast (e.g. sorting and joining later on).
     """
-    dataframe = pandas.read_csv(
+    chunks = pandas.read_csv(
         table_file,  # May take path or file handle
         header=table_data_start,  # Header row index, 0-indexed
         delimiter=table_delimiter,
-        parse_dates={"Time": ["Datum", "Uhrzeit"]},  # For explicit errors
-        infer_datetime_format=True,
-        index_col="Time",  # Again, be explicit
-        decimal=","  # German/European data
+        # pyarrow would be faster, but cannot handle our decimal separator:
+        engine="c",
+        dtype={"Datum": str, "Uhrzeit": str},  # Parsed explicitly below
+        decimal=",",  # German/European data
+        encoding=table_encoding,
+        # Read in chunks of rows, so that the (memory-hungry) date and time
+        # strings never exist for the entire, possibly huge, file at once:
+        chunksize=200_000
     )
+    dataframe = pandas.concat(index_by_time(chunk) for chunk in chunks)
 
     # Drop all NaN columns (they occur since our rows *end* on delimiter,
     # generating an extra empty column of NaNs)
@@ -166,9 +278,30 @@ def csv_to_dataframe(table_file, table_data_start: int, table_delimiter: str):
     )
 
     # We rely on proper numeric types in all columns for later calculations:
-    for y in dataframe.columns:
-        if not pandas.api.types.is_numeric_dtype(dataframe[y]):
-            raise TypeError("Not all columns are numeric. Wrong delimiter?")
+    numeric = dataframe.dtypes.map(pandas.api.types.is_numeric_dtype)
+    if not numeric.all():
+        raise TypeError(
+            "Not all columns are numeric "
+            f"({list(dataframe.columns[~numeric])}). Wrong delimiter?"
+        )
+
+    # Single precision (~7 significant digits) is plenty for sensor readings
+    # and halves the memory all later operations have to move. Only floats
+    # are downcast: integer columns (e.g. counters) have to stay exact.
+    floats = dataframe.select_dtypes("float64").columns
+    dataframe = dataframe.astype(dict.fromkeys(floats, numpy.float32))
+
+    # Parsing leaves one array per column (plus leftovers from dropping
+    # columns). Rebuild from a single 2D, row-major array instead: one
+    # consolidated block with rows contiguous in memory, which suits the
+    # row-wise work later on (joining, sorting, plotting). Only possible
+    # without upcasting if all columns share one type.
+    if dataframe.dtypes.nunique() == 1:
+        dataframe = pandas.DataFrame(
+            numpy.ascontiguousarray(dataframe.to_numpy()),
+            index=dataframe.index,
+            columns=dataframe.columns
+        )
     return dataframe
 
 
@@ -176,6 +309,53 @@ def csv_to_dataframe(table_file, table_data_start: int, table_delimiter: str):
 tz = pytz.timezone("Europe/Berlin")  # For localization of datetime
 logging.info(f"Set timezone to {tz}.")
 
+# Known date formats in file headers, tried in order. dateutil's guessing is
+# only used if none of these fit, since it is much slower.
+date_formats = (
+    "%d.%m.%Y, %H:%M:%S",  # e.g. "22.02.2019, 10:33:35"
+    "%Y-%m-%d %H:%M:%S",
+)
+
+# Format of the "Datum" and "Uhrzeit" table columns, joined by a space:
+timestamp_format = "%d.%m.%Y %H:%M:%S,%f"  # e.g. "22.02.2019 10:33:35,00000"
+
+# Keywords in file header rows (lowercase) and what to do with them:
+# (metadata key, conversion of the raw row, collect multiple occurrences?).
+# Replaces an if/elif cascade; looked up through a single compiled regex.
+header_keywords = {
+    "software": ("generated_by", str.strip, False),
+    "aufgenommen": (
+        "date_recorded",
+        lambda row: tz.localize(parse_date(header_entry(row))),
+        False
+    ),
+    "blocklaenge": (
+        "block_length", lambda row: value_cleanup(header_entry(row)), False
+    ),
+    "delta": ("delta/s", lambda row: value_cleanup(header_entry(row)), False),
+    "kanalzahl": (
+        "channel_count", lambda row: value_cleanup(header_entry(row)), False
+    ),
+    "oil": ("oils", header_entry, True),
+    "elastomer": ("elastomers", header_entry, True),
+    "welle": ("shafts", header_entry, True),
+    "versuchsname": ("name", header_entry, False),
+    "versuchsstand": (
+        "station", lambda row: value_cleanup(header_entry(row)), False
+    ),
+    "kalibriergew": (
+        "cal_weights/kg", lambda row: value_cleanup(header_entry(row)), True
+    ),
+    "tariergew": (
+        "tar_weights_frac",
+        lambda row: value_cleanup(header_entry(row))
+        * 100 / 100 ** 2,  # 0.0000, avoiding float arithmetic
+        True
+    ),
+}
+
+header_keyword_pattern = re.compile("|".join(header_keywords), re.I)
+
 # A better approach for matching would be regexs
 categories = {  # All expected categories of physical quantities
     "Temperature": {
@@ -252,6 +432,20 @@ categories = {  # All expected categories of physical quantities
 
 categories = pandas.DataFrame(categories)  # nicer tabular __repr__/print etc.
 
+# Column name prefixes mapped to their category, to find a column's category
+# through a single match. The alternation keeps the order of categories, so
+# the first category with a fitting prefix wins (e.g. "Umfangsg" over "U"):
+category_prefixes = {
+    prefix: cat
+    for cat, cat_attr in categories.items()
+    for prefix in cat_attr["cols"]
+}
+category_prefix_pattern = re.compile(
+    "|".join(re.escape(prefix) for prefix in category_prefixes)
+)
+
+digit_pattern = re.compile(r"\d")  # Index number in column names
+
 # These are going to be plotted, if available:
 desired_plot_cats = [  # keys for categories dictionary
     "Temperature",
@@ -264,6 +458,16 @@ desired_plot_cats = [  # keys for categories dictionary
     "Heating_Spec"
 ]
 
+# Dense time series (especially 'seconds' data) are slow to render and bloat
+# the PDF if every sample is kept as a vector path. Lines are rasterized (see
+# plotting below) at a resolution high enough for print:
+plt.rcParams.update({
+    "path.simplify": True,
+    "path.simplify_threshold": 1.0,  # Merge segments closer than a pixel
+    "agg.path.chunksize": 10_000,  # Render long lines in chunks
+    "savefig.dpi": 300,
+})
+
 indices = {  # keys found in header columns are to be replaced by their values
     "welle": "W",
     "fluid": "F",
@@ -277,20 +481,29 @@ indices = {  # keys found in header columns are to be replaced by their values
 delimiter = ";"  # Delimiter used in tables
 logging.info(f"Set expected table delimiter to '{delimiter}'.")
 
-
-def quick_compile(regex):
-    """Wrapper for reoccurring regex compilation operation"""
-    return re.compile(r"\w+" + regex + r"\w+", re.I)
+table_encoding = "latin-1"  # Encoding of tables (single byte, never fails)
 
 
+# File types and what their file names contain. Ignored types come first, so
+# they take precedence:
 file_patterns = {
-    "minutes": quick_compile(r"_S\d\."),
-    "seconds": quick_compile(r"_S\d_sek\."),
-    "log": quick_compile(r"_LOGFILE\."),
-    "heizung": quick_compile(r"Heizung")
+    "log": r"_LOGFILE\.",
+    "heizung": r"Heizung",
+    "minutes": r"_S\d\.",
+    "seconds": r"_S\d_sek\.",
 }
 
-ignored_patterns = [file_patterns[x] for x in ["log", "heizung"]]
+ignored_file_types = ["log", "heizung"]
+
+# All file types in a single pattern, so that one match classifies a file.
+# The name of the matching group is the file type:
+file_pattern = re.compile(
+    "|".join(
+        rf"(?P<{file_type}>\w+{pattern}\w+)"
+        for file_type, pattern in file_patterns.items()
+    ),
+    re.I
+)
 
 # Files are saved in this subdirectory:
 base_export_dir = Path("out")
@@ -299,6 +512,18 @@ try:
 except FileExistsError:
     pass
 
+# Parsed input files are cached here (as Parquet, which needs pyarrow), so
+# re-runs do not have to parse unchanged files again:
+if pyarrow is None:
+    cache_dir = None
+    logging.info("pyarrow not available, parsed files will not be cached.")
+else:
+    cache_dir = Path(".cache")
+    try:
+        cache_dir.mkdir()
+    except FileExistsError:
+        pass
+
 for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
     # General export directory path mimics the current subdirectory we are in:
     export_subdir = base_export_dir.joinpath(subdir.parts[-1])
@@ -317,13 +542,16 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
     logging.info(f"Created new subdirectory '{analysis_dir}'.")
 
     # Variables local to each subdirectory:
-    dfs = {  # dataframes for the different kinds of recorded data
+    # Dataframes for the different kinds of recorded data. Each list holds
+    # groups of dataframes (parts) that share their column names:
+    dfs = {
         "minutes": [],
         "seconds": []
     }
 
     got_metadata = False  # Acquire metadata once for each experiment/subdir
 
+    files = {}  # Files to work on and their time type
     for file in subdir.iterdir():
         # Only work on files with our specified file extension:
         if not re.match(r"(?i).+\.asc", file.name):
@@ -336,91 +564,77 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
         elif "lock" in file.name.lower():
             logging.warning(f"File will be ignored (locked): {file.name}.")
             continue
-        # Check if any of the patterns we introduced matches:
-        elif any([x.match(file.name) for x in ignored_patterns]):
+        # Check which of the patterns we introduced matches, if any:
+        file_match = file_pattern.match(file.name)
+        if file_match is None:
+            logging.warning(
+                f"File will be ignored (fell through): {file.name}.")
+            continue
+        elif file_match.lastgroup in ignored_file_types:
             logging.warning(f"File will be ignored (pattern): {file.name}.")
             continue
+        files[file] = file_match.lastgroup
+
+    # Reading and parsing is independent for each file, so do it in parallel.
+    # Threads suffice, since pandas' C parser releases the GIL while parsing.
+    # Results come back in order of submission.
+    with ThreadPoolExecutor() as executor:
+        tables = executor.map(
+            partial(
+                read_table, table_delimiter=delimiter, cache_dir=cache_dir
+            ),
+            files
+        )
 
-        logging.info(f"Starting work on file '{file.name}'.".upper())
-
-        # Get header row aka data start. This runs once for each file,
-        # even if they share the same data start column (safe approach)
-        with open(file) as spreadsheet:
-            for table_index, row_content in enumerate(spreadsheet):
-                lrow = row_content.lower()
-                # Find column header row/data start based on these criteria:
-                if "datum" in lrow and lrow.count(delimiter) > 1:
-                    logging.info("Found the column header in row "
-                                 f"{table_index + 1}.")
-                    # Dismiss remaining rows after header.
-                    # At this point, table_index corresponds to the row
-                    # index where data starts/column header is found.
-                    break
-
-        # After filtering out the unwanted files, we must have found a
-        # proper one. Turn it into a new dataframe:
-        logging.info(f"Turning file '{file.name}' into pandas dataframe.")
-        new_df = csv_to_dataframe(file, table_index, delimiter)
-        logging.info(f"Turned file '{file.name}' into pandas dataframe.")
-
-        # Now go through our time_types to see what type the found file
-        # belongs to:
-        for time_type in dfs:
-            # Check if it is actually a match, so that 'minutes' is not
-            # confused for 'seconds' data etc.:
-            if file_patterns[time_type].match(file.name):
-                # Find the metadata, but only once. For this, set flag
-                # once we are done. Do this only after a match has occurred,
-                # else we might be working on an illegitimate file.
-                if time_type is "minutes" and not got_metadata:
-                    with open(file) as spreadsheet:
-                        logging.info("Collecting metadata from "
-                                     f"file '{file.name}'.")
-                        metadata = get_metadata(spreadsheet, table_index)
-                        logging.info(f"Collected metadata from "
-                                     f"file '{file.name}'.")
-                    # Owed to this flag, this if-block is never entered again:
-                    got_metadata = True
-                # Now, go through the dataframes we have already collected in
-                # our dictionary. Do this for the current time type.
-                # If there is any intersection, i.e. common column names,
-                # between one of the already existing dataframes for this time
-                # type, and the newly added one, it is concluded that these
-                # have the save column names. Therefore, they are concatenated
-                # (vertically). This corresponds to finding a "_zwei_" file.
-                # Such concatenation with .concat() is joined as 'outer' per
-                # default so we lose no data and NaNs show up if something went
-                # wrong.
-                # If no such match in any column names is found (reached the
-                # end of the iteration), there is no such category existing yet,
-                # so we append it using 'else' of the for-loop.
-                # Since the dfs dictionary is empty when we start, the
-                # iteratin immediately hits the 'else' block as well and the
-                # first value is appended.
-                # This procedure means that we simply concatenate all dataframes
-                # with the same (more precisely, similar) column names: we
-                # do not have to care for treating '_zwei_' files specially.
-                for i, existing_df in enumerate(dfs[time_type]):
-                    if any(new_df.columns.intersection(existing_df.columns)):
-                        logging.info("The new dataframe has at least one "
-                                     "column in common with an already existing"
-                                     f" dataframe for '{time_type}' data: "
-                                     "concatenating the two.")
-                        dfs[time_type][i] = pandas.concat(
-                            [dfs[time_type][i], new_df])
-                        break
-                else:
-                    logging.info("The new dataframe seems unique "
-                                 "(no overlap in column names with existing "
-                                 f"dataframes for '{time_type}' data): "
-                                 "appending it.")
-                    dfs[time_type].append(new_df)
-                # If we entered this block, some match must have occurred.
-                # Therefore, break out so we do not hit the 'else' block that
-                # catches any file that fell through.
+    for (file, time_type), (header_rows, new_df) in zip(files.items(), tables):
+        # Find the metadata, but only once. For this, set flag
+        # once we are done. Only 'minutes' files carry the metadata we want.
+        if time_type == "minutes" and not got_metadata:
+            logging.info("Collecting metadata from "
+                         f"file '{file.name}'.")
+            metadata = get_metadata(header_rows, str(file))
+            logging.info(f"Collected metadata from "
+                         f"file '{file.name}'.")
+            # Owed to this flag, this if-block is never entered again:
+            got_metadata = True
+            # Factor from rotational speed (rpm) to tangential velocity (m/s),
+            # the same for all time types:
+            rpm_to_tan_vel = math.pi * metadata["diameter/m"] / 60
+        # Now, go through the groups of dataframes we have already
+        # collected in our dictionary. Do this for the current time
+        # type.
+        # If there is any intersection, i.e. common column names,
+        # between one of the already existing groups for this time
+        # type, and the newly added dataframe, it is concluded that
+        # these have the save column names. Therefore, the new one is
+        # added to that group, to be concatenated (vertically) later.
+        # This corresponds to finding a "_zwei_" file.
+        # Concatenation happens only once all parts are collected:
+        # concatenating on every new part would copy all previous
+        # parts over and over again.
+        # If no such match in any column names is found (reached the
+        # end of the iteration), there is no such category existing yet,
+        # so we start a new group using 'else' of the for-loop.
+        # Since the dfs dictionary is empty when we start, the
+        # iteratin immediately hits the 'else' block as well and the
+        # first group is appended.
+        # This procedure means that we simply concatenate all dataframes
+        # with the same (more precisely, similar) column names: we
+        # do not have to care for treating '_zwei_' files specially.
+        for parts in dfs[time_type]:
+            if any(new_df.columns.intersection(parts[0].columns)):
+                logging.info("The new dataframe has at least one "
+                             "column in common with an already existing"
+                             f" dataframe for '{time_type}' data: "
+                             "collecting it for concatenation.")
+                parts.append(new_df)
                 break
         else:
-            logging.warning(f"File was ignored (fell through): {file.name}.")
+            logging.info("The new dataframe seems unique "
+                         "(no overlap in column names with existing "
+                         f"dataframes for '{time_type}' data): "
+                         "appending it.")
+            dfs[time_type].append([new_df])
 
     for time_type in dfs:
         logging.info(f"Starting processing of '{time_type}' data.".upper())
@@ -428,6 +642,13 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
         if all(x is None for x in dfs[time_type]):
             logging.warning(f"No data found for '{time_type}', skipping it.")
             continue
+        # Concatenate the parts of each group in one go. Such concatenation
+        # with .concat() is joined as 'outer' per default so we lose no data
+        # and NaNs show up if something went wrong.
+        logging.info(f"Concatenating dataframe parts for '{time_type}'.")
+        dfs[time_type] = [pandas.concat(parts) for parts in dfs[time_type]]
+        logging.info(f"Concatenated dataframe parts for '{time_type}'.")
+
         # For each, join all dataframe-parts found in the list.
         # Join the first element with all subsequent ones, then override
         # so we release memory.
@@ -451,7 +672,7 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
         # Different cases occur, filter with regex.
         logging.info(f"Calculating additional columns for '{time_type}'.")
         dfs[time_type]["Umfangsg. [m/s]"] = dfs[time_type].filter(
-            regex=r"(?i)n_i\w+").multiply(math.pi * metadata["diameter/m"] / 60)
+            regex=r"(?i)n_i\w+").multiply(rpm_to_tan_vel)
         logging.info(f"Calculated additional columns for '{time_type}'.")
 
         category_col = []  # New column header for physical quantity *category*
@@ -467,61 +688,50 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
 
         for col_name in dfs[time_type].columns.to_list():
             logging.info(f"Working on column '{col_name}' for '{time_type}'.")
-            # each category of phys. quantities and its attributes (units, ...)
-            for cat, cat_attr in categories.items():
-                possible_cols = cat_attr["cols"]  # possibilities to match for
-                symbol = cat_attr["symbol"]  # physical symbol
-                unit = cat_attr["unit"]
-
-                # Note tuple v. list: tuple matches any
-                if col_name.startswith(tuple(possible_cols)):
-                    category_col.append(f"{cat}")  # /{unit}")
-                    logging.info(f"Assigned category '{cat}' "
-                                 f"to column '{col_name}'.")
-
-                    # Index for the physical symbol.
-                    # Initialize and let them fall through as None
-                    # if not changed; None is filtered out later:
-                    idx_abbr = None
-                    idx_no = None
-
-                    # Try to assign an index name:
-                    for k, abbreviation in indices.items():
-                        if k in col_name.lower():
-                            idx_abbr = abbreviation
-                            break
-
-                    # A bit hacky; *exclude* this unit from digit search:
-                    if not "[min-1]" in col_name.lower():
-                        try:
-                            # Fails if no match found:
-                            # NoneType has no group() method.
-                            # Else, extracts matching string through group(0)
-                            idx_no = re.search(r"\d", col_name).group(0)
-                        except AttributeError:
-                            logging.warning(f"No index number found "
-                                            f"for column '{col_name}'.")
-                            # pass: idx_no stays as initialized above
-
-                    # Omit underscore separation if symbol already includes one:
-                    symbol_sep = "_" if "_" not in symbol else None
-
-                    # Join symbol + all filtered (None thrown out) parts:
-                    symbol_col.append(symbol +
-                                      "".join(
-                                          filter(None,
-                                                 (symbol_sep, idx_abbr, idx_no)
-                                                 )
-                                      )
-                                      )
-                    logging.info(f"Renamed column '{col_name}' "
-                                 f"to '{symbol_col[-1]}'.")
-                    break  # Match found, leave
-            else:  # When no match found, aka no 'break' occurred
+            match = category_prefix_pattern.match(col_name)
+            if match is None:  # Column name starts with no known prefix
                 category_col.append("Other")
                 symbol_col.append("??")
                 logging.warning(f"No category or symbol found "
                                 f"for column '{col_name}'.")
+                continue
+
+            # Category of phys. quantities and its attributes (units, ...):
+            cat = category_prefixes[match.group(0)]
+            symbol = categories[cat]["symbol"]  # physical symbol
+            category_col.append(f"{cat}")
+            logging.info(f"Assigned category '{cat}' to column '{col_name}'.")
+
+            # Index for the physical symbol.
+            # Initialize and let them fall through as None
+            # if not changed; None is filtered out later:
+            idx_abbr = None
+            idx_no = None
+
+            # Try to assign an index name:
+            for k, abbreviation in indices.items():
+                if k in col_name.lower():
+                    idx_abbr = abbreviation
+                    break
+
+            # A bit hacky; *exclude* this unit from digit search:
+            if not "[min-1]" in col_name.lower():
+                digit = digit_pattern.search(col_name)
+                if digit is None:
+                    logging.warning(f"No index number found "
+                                    f"for column '{col_name}'.")
+                else:
+                    idx_no = digit.group(0)
+
+            # Omit underscore separation if symbol already includes one:
+            symbol_sep = "_" if "_" not in symbol else None
+
+            # Join symbol + all filtered (None thrown out) parts:
+            symbol_col.append(
+                symbol + "".join(filter(None, (symbol_sep, idx_abbr, idx_no)))
+            )
+            logging.info(f"Renamed column '{col_name}' "
+                         f"to '{symbol_col[-1]}'.")
 
         # Replace single header row with two new ones as two lists:
         # [[category1, category2, category1, category1, category3, ...],
@@ -539,7 +749,7 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
         dfs[time_type].to_csv(csv_path, float_format="%g")
         logging.info(f"Saved time type '{time_type}' to '{csv_path}'.")
 
-        if time_type is "minutes":
+        if time_type == "minutes":
             logging.info(f"Processing tasks specific to '{time_type}'.")
             # E.g. if we plot the "Torque" category, all average/min/max columns
             # are included; these should be left out.
@@ -600,7 +810,13 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
                 # Loop over all plots and add to subfigure environment:
                 for ax_no, available_plot_cat in enumerate(available_plot_cats):
                     # axes obj. already generated, use it for subplot:
-                    dfs[time_type][available_plot_cat].plot(ax=subaxs[ax_no])
+                    dfs[time_type][available_plot_cat].plot(
+                        ax=subaxs[ax_no],
+                        rasterized=True,  # Bitmap, not one path per sample
+                        # Plain datetime x-values, so that the lines can be
+                        # reused for the full-page plots below:
+                        x_compat=True
+                    )
                     subaxs[ax_no].set_ylabel(
                         categories[available_plot_cat]["symbol"] + " / " +
                         categories[available_plot_cat]["unit"]
@@ -618,20 +834,30 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
                 # Almost same loop again. Required since we want to save subfig
                 # first, so it shows up on the first page. All the next plots
                 # are full-page individual plots, each appended
-                # (savefig() in loop) to pdf.
-                for available_plot_cat in available_plot_cats:
-                    fullaxs = dfs[time_type][available_plot_cat].plot(
-                        figsize=(11.69, 8.27),  # A4 in landscape
-                        title=plot_title
+                # (savefig() in loop) to pdf. They reuse the overview's lines
+                # instead of having pandas prepare and plot the data again.
+                for ax_no, available_plot_cat in enumerate(available_plot_cats):
+                    fullfig, fullaxs = plt.subplots(
+                        figsize=(11.69, 8.27)  # A4 in landscape
                     )
+                    for line in subaxs[ax_no].get_lines():
+                        fullaxs.plot(
+                            line.get_xdata(),
+                            line.get_ydata(),
+                            label=line.get_label(),
+                            rasterized=True
+                        )
+                    fullaxs.set_title(plot_title)
+                    fullaxs.set_xlabel(dfs[time_type].index.name)
                     fullaxs.set_ylabel(
                         available_plot_cat + " / " +
                         categories[available_plot_cat]["unit"]
                     )
                     fullaxs.grid(linestyle=":")
+                    fullaxs.legend()
 
                     # in loop: save once aka one page for each iteration:
-                    pdf.savefig()
+                    pdf.savefig(fullfig)
                     logging.info("Saved full-size plot for category "
                                  f"'{available_plot_cat}' to PDF file.")
 
@@ -646,7 +872,7 @@ for subdir in [x for x in Path("in").iterdir() if x.is_dir()]:
 
             logging.info(f"Saved PDF to '{pdffile_path}'.")
 
-        elif time_type is "seconds":
+        elif time_type == "seconds":
             logging.info(f"Processing tasks specific to '{time_type}'.")
             # 'minutes' data is already averaged,
             # therefore get summary from raw 'seconds' data:
@@ -21,6 +21,13 @@ except ModuleNotFoundError:
 
 
 def docker_logs(container_name):
-    """Fetches all available log lines (entries) from a container."""
+    """Yields all available log lines (entries) from a container, as they arrive."""
     container = _DOCKER.containers.get(container_name)
-    return [entry for entry in container.logs().decode("utf8").split("\n") if entry]
+    rest = b""  # Chunks need not end on line boundaries
+    for chunk in container.logs(stream=True, follow=False):
+        *entries, rest = (rest + chunk).split(b"\n")
+        for entry in entries:
+            if entry:
+                yield entry.decode("utf8")
+    if rest:
+        yield rest.decode("utf8")
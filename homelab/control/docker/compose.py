@@ -4,11 +4,13 @@ https://github.com/docker/compose/issues/4542.
 
 import argparse
 import logging
+from collections import defaultdict
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from functools import wraps
+from functools import partialmethod
 from pathlib import Path
-from re import compile
+from re import ASCII, compile
 from shlex import split
 from subprocess import CalledProcessError, CompletedProcess
 from textwrap import dedent
@@ -16,10 +18,17 @@ from typing import Callable, List
 
 import yaml  # Already present if docker-compose is installed
 from control.docker import _DOCKER
+from control.util.files import walk
 from control.util.log import LOGGER, log_calls
 from control.util.misc import sorted_reverse
 from control.util.procs import CalledTextProcessError, DnsResolutionError, retry, text_run
 
+try:
+    # Much faster, but requires PyYAML to have been built against libyaml:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 
 @dataclass
 class CommandMetadata:
@@ -27,6 +36,8 @@ class CommandMetadata:
 
     desc: str  # Simple command description
     order: Callable  # Ordering should *multiple* compose files be executed serially
+    # Whether compose files can be acted on concurrently, ignoring `order`:
+    parallel: bool = False
 
     def __post_init__(self):
         self._validate()
@@ -41,7 +52,12 @@ class CommandMetadata:
 COMMANDS = {}
 
 
-def _register_command(order, name=None, desc=None):
+def _register(name, metadata):
+    COMMANDS[name] = metadata
+    LOGGER.debug(f"Registered {name} as a command.")
+
+
+def _register_command(order, name=None, desc=None, parallel=False):
     """Decorator to register a function or method as a command."""
 
     def decorator(func):
@@ -54,28 +70,27 @@ def _register_command(order, name=None, desc=None):
         if name is None:
             name = func.__name__
 
-        COMMANDS[name] = CommandMetadata(desc, order)
-        LOGGER.debug(f"Registered {name} as a command.")
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            return func(*args, **kwargs)
-
-        wrapper._order = order
-        return wrapper
+        _register(name, CommandMetadata(desc, order, parallel))
+        return func
 
     return decorator
 
 
+# Maps named groups of the below pattern to the exceptions to convert to.
 _STDERR_CONVERSIONS = {
-    compile(
-        # Examples for strings that are supposed to match:
-        # "error resolving passed in nfs address: lookup nas.lan on 192.168.0.1:53: no such host"
-        # "error resolving passed in nfs address: lookup nas.lan on [::1]:53: read udp [::1]:39188->[::1]:53: read: connection refused"
-        r"error resolving [\w ]+? address: lookup [\w\.]+? on .+? (read udp|no such host)"
-    ): DnsResolutionError,
+    "dns": DnsResolutionError,
 }
 
+# All conversions as a single alternation, so stderr is only scanned once. stderr is
+# plain ASCII, sparing the regex engine Unicode semantics.
+_STDERR_PATTERN = compile(
+    # Examples for strings that are supposed to match `dns`:
+    # "error resolving passed in nfs address: lookup nas.lan on 192.168.0.1:53: no such host"
+    # "error resolving passed in nfs address: lookup nas.lan on [::1]:53: read udp [::1]:39188->[::1]:53: read: connection refused"
+    r"(?P<dns>error resolving [\w ]+? address: lookup [\w\.]+? on .+? (?:read udp|no such host))",
+    ASCII,
+)
+
 
 @retry(on_exception=DnsResolutionError)
 @log_calls(as_level=logging.DEBUG)
@@ -90,27 +105,61 @@ def _run(cmd, subcmd, flags=None, **kwargs) -> CompletedProcess:
     try:
         return text_run(cmd + split(subcmd) + flags, **kwargs)
     except CalledTextProcessError as e:
-        # Examine the standard error output, trying to find matches. If a match is found,
-        # convert raised exception to a more fitting one.
-        for regex, exception in _STDERR_CONVERSIONS.items():
-            match = regex.search(e.stderr)
-            if match:
-                LOGGER.warning(
-                    f"Process' stderr matched against {regex}, raising {exception}"
-                )
-                raise exception(**vars(e)) from e
+        # Examine the standard error output, trying to find a match. If a match is
+        # found, convert raised exception to a more fitting one.
+        match = _STDERR_PATTERN.search(e.stderr)
+        if match:
+            exception = _STDERR_CONVERSIONS[match.lastgroup]
+            LOGGER.warning(
+                f"Process' stderr matched against '{match.lastgroup}', raising {exception}"
+            )
+            raise exception(**vars(e)) from e
 
         raise
 
 
+def _containers_by_working_dir():
+    """Maps docker-compose working directories to their running containers."""
+    index = defaultdict(list)
+    for container in _DOCKER.containers.list():
+        labels = container.labels
+        try:
+            working_dir = Path(labels["com.docker.compose.project.working_dir"])
+        except KeyError:  # Not part of any docker-compose service
+            continue
+        index[working_dir].append(container)
+    return index
+
+
+def _run_subcommand(composition, subcmd, flags=None):
+    # For docker-compose, it's important to run in the correct working directory to
+    # resolve all files, e.g. `.env` files.
+    return _run(composition._base_cmd, flags=flags, subcmd=subcmd, cwd=composition.cwd)
+
+
 class CompositionMeta(type):
     def __new__(cls, name, bases, namespace):
         new_cls = super().__new__(cls, name, bases, namespace)
 
         new_cls._base_cmd = ["docker-compose", "--no-ansi"]
 
+        # Subcommands which only read, or whose effects do not depend on other
+        # compositions. They just wait on their `docker-compose` processes.
+        parallel_subcommands = {
+            "build",
+            "config",
+            "events",
+            "images",
+            "logs",
+            "ps",
+            "pull",
+            "push",
+            "top",
+            "version",
+        }
+
         base_subcommands = {
-            name: CommandMetadata(desc, order)
+            name: CommandMetadata(desc, order, name in parallel_subcommands)
             for name, desc, order in [
                 ("build", "Build or rebuild services.", sorted),
                 ("config", "Validate and view the Compose file.", sorted),
@@ -149,56 +198,31 @@ class CompositionMeta(type):
         # this via `__getattr__` in the class definition, but that's ugly and boring,
         # plus we don't get autocompletion on available commands.
         for subcmd, metadata in base_subcommands.items():
-            # Keep argument local to lambda using the signature, see also
-            # https://docs.python.org/3/faq/programming.html#why-do-lambdas-defined-in-a-loop-with-different-values-all-return-the-same-result
-            def subcmd_factory(subcmd=subcmd):
-                """Returns a specialized function with fixed arguments.
-
-                By specifically introducing `command` in the function signature,
-                a new scope is created to allow the new returned function to access the
-                correct object.
-                """
-
-                @_register_command(
-                    name=subcmd, desc=metadata.desc, order=metadata.order,
-                )
-                def subcmd_run(self, flags=None):
-                    # For docker-compose, it's important to run in the correct working
-                    # directory to resolve all files, e.g. `.env` files.
-                    return _run(
-                        self._base_cmd, flags=flags, subcmd=subcmd, cwd=self.cwd,
-                    )
-
-                return subcmd_run
-
+            _register(subcmd, metadata)
             name = subcmd.lower()
             LOGGER.debug(f"Providing method '{name}' for {new_cls}.")
-            setattr(new_cls, name, subcmd_factory())
+            # All share one implementation, only differing in the fixed subcommand:
+            setattr(new_cls, name, partialmethod(_run_subcommand, subcmd))
         return new_cls
 
 
 class Composition(metaclass=CompositionMeta):
-    def __init__(self, file):
+    def __init__(self, file, server=None):
         self.file = Path(file).resolve(strict=True)
+        # If part of a server, share its container lookups:
+        self._server = server
         self.cwd = self.file.parent
         self.project = self.cwd.parts[-1]
         with open(self.file) as f:
-            self._config = yaml.safe_load(f)
-
-        self._check_validity()
+            self._config = yaml.load(f, Loader=_SafeLoader)
 
     @property
     def containers(self):
-        containers = _DOCKER.containers.list()
-        for container in containers:
-            labels = container.labels
-            try:
-                working_dir = Path(labels["com.docker.compose.project.working_dir"])
-            except KeyError:  # Not part of any docker-compose service
-                continue
-            if self.file.parent == working_dir:
-                # Part of this docker-compose service
-                yield container
+        if self._server is None:
+            index = _containers_by_working_dir()
+        else:
+            index = self._server.container_index
+        yield from index.get(self.cwd, [])
 
     @_register_command(sorted)
     def update(self, remainder):
@@ -307,7 +331,7 @@ class Composition(metaclass=CompositionMeta):
         """Enable sorting by lexicographical order of their file paths."""
         return self.file < other.file
 
-    def _check_validity(self):
+    def validate(self):
         """Checks if a file is a valid docker-compose file."""
         try:
             self.config("--quiet")  # Don't spam log
@@ -322,17 +346,61 @@ class Composition(metaclass=CompositionMeta):
         return f"{cls.__name__}(file={self.file})"
 
 
+_COMPOSE_FILE_NAMES = ("docker-compose.yml", "docker-compose.yaml")
+
+# Upper bound of `docker-compose` processes running at the same time, sparing the
+# host (and registries, for `pull`/`push`) from one process per composition:
+_MAX_PARALLEL = 32
+
+
 class Server(Sequence):
     """Holds docker-compose compositions and acts on them according to a command."""
 
     def __init__(self, root: Path, command: str):
         self.root = Path(root).resolve(strict=True)
 
-        items = root.rglob("docker-compose.y*ml")
-        self._compositions = [Composition(item) for item in items]
+        items = (
+            entry.path
+            for entry in walk(self.root)
+            if entry.name in _COMPOSE_FILE_NAMES and entry.is_file()
+        )
+        self._compositions = [Composition(item, server=self) for item in items]
+        self._validate()
+        self._container_index = None
 
         self.command = command
 
+    @property
+    def container_index(self):
+        """Running containers by working directory, queried once until invalidated."""
+        if self._container_index is None:
+            self._container_index = _containers_by_working_dir()
+        return self._container_index
+
+    def _executor(self):
+        """Thread pool for running `docker-compose` on compositions side by side."""
+        return ThreadPoolExecutor(max_workers=min(_MAX_PARALLEL, len(self)) or None)
+
+    def _validate(self):
+        """Validates all compositions, raising if any of them is invalid."""
+        # Each validation waits on its own `docker-compose` process, independent of
+        # all others, so run them side by side.
+        with self._executor() as executor:
+            futures = [executor.submit(c.validate) for c in self]
+
+            invalid = []
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except ValueError as e:
+                    LOGGER.error(e)
+                    invalid.append(e)
+
+        if invalid:
+            raise ValueError(
+                f"Found {len(invalid)} invalid docker-compose file(s)."
+            ) from invalid[0]
+
     def run(self, remainder: List[str]):
         """Runs the current command on all compositions in their current order."""
 
@@ -343,12 +411,24 @@ class Server(Sequence):
                 f"Running {cls} command '{self.command}' with remainder '{remainder}'..."
             )
 
+        self._container_index = None  # Containers might have changed since last run
+        metadata = COMMANDS[self.command]
+        order = metadata.order
+        if metadata.parallel and not help_only:
+            with self._executor() as executor:
+                actions = [
+                    getattr(composition, self.command)  # Instance lookup
+                    for composition in order(self)
+                ]
+                return list(executor.map(lambda action: action(remainder), actions))
+
         results = []
-        order = getattr(Composition, self.command)._order  # Class lookup
         for composition in order(self):
             action = getattr(composition, self.command)  # Instance lookup
 
             res = action(remainder)
+            # Serial commands might change containers, affecting later compositions:
+            self._container_index = None
 
             if help_only:
                 # If only help on a subcommand is requested, print it out *once* and
@@ -4,12 +4,11 @@ import argparse
 import io
 import json
 import tarfile
-from functools import partial
-from getpass import getpass, getuser
+from getpass import getuser
 from pathlib import Path
-from sys import exit, stderr, stdout
+from subprocess import run
+from sys import stdout
 
-import ipinfo
 from control.docker import _DOCKER, docker_logs
 from control.util.files import (
     PYTHON_PACKAGE_ROOT,
@@ -19,58 +18,24 @@ from control.util.files import (
 )
 from control.util.log import LOGGER
 from control.util.misc import pprint
+from control.util.procs import text_run
 from control.util.time import aware_timestamp, now
-from jinja2 import Environment, FileSystemLoader
-from jinja2.runtime import StrictUndefined
-from pexpect import spawn
-from pexpect.exceptions import EOF
 
+# `ipinfo` and `jinja2` are only imported within the functions needing them. Each
+# action only requires one of them, sparing the CLI startup the other.
 
-class _AutoFill:
-    """pexpect calls `flush`/`write` when logging, we intercept and overwrite here.
-
-    Used to replace any written data with a fixed, predetermined string, e.g. to mask
-    input passwords while hinting that a prompt has been answered.
-    """
-
-    def __init__(self, io, print="<Autofilled>"):
-        self._io = io
-        self.print = print
-
-    def flush(self):
-        self._io.flush()
-
-    def write(self, _):
-        return self._io.write(self.print)
-
-
-def cli_interact(cmd, args, expect, reply, log=stdout):
-    with spawn(cmd, args, encoding="utf-8", echo=False) as proc:
-        proc.logfile_read = log
-        proc.logfile_send = _AutoFill(log)
-
-        while True:
-            # Reply to *all* prompts of expected form, e.g, for `systemctl` it prompts
-            # for a password twice:
-            # 1. `Authentication is required to manage system service or unit files.`
-            # 2. `Authentication is required to reload the systemd state.`
-            try:
-                proc.expect_exact(expect)
-                proc.sendline(reply)
-            except EOF:
-                break
-    log.write("\n")
-    error_status = proc.exitstatus or proc.signalstatus
-    if error_status:
-        stderr.write(f"Interaction failed, process returned {error_status}. Exiting.\n")
-        stderr.flush()
-        exit(error_status)
-
-    return proc
+try:
+    # Parses the (potentially millions of) log lines several times faster:
+    from orjson import loads
+except ImportError:
+    from json import loads
 
 
 def link(sysctl="systemctl", log=stdout):
     """Renders systemd unit file templates and sets them up (enabling+starting)."""
+    from jinja2 import Environment, FileSystemLoader
+    from jinja2.runtime import StrictUndefined
+
     template_dir = PYTHON_PACKAGE_ROOT / "util" / "templates"
 
     env = Environment(
@@ -90,14 +55,7 @@ def link(sysctl="systemctl", log=stdout):
     rendered_dir = template_dir / ".rendered"
     rendered_dir.mkdir(exist_ok=True)
 
-    sysctl_interact = partial(
-        cli_interact,
-        cmd=sysctl,
-        expect="Password:",
-        reply=getpass(f"{sysctl} requires your password:"),
-        log=log,
-    )
-
+    unit_files = []
     for item in template_dir.iterdir():
         if not item.is_file():
             continue
@@ -107,14 +65,23 @@ def link(sysctl="systemctl", log=stdout):
         unit_file = strip_last_suffix(rendered_dir / name)
         with open(unit_file, "w") as f:
             f.write(template.render(vars))
+        unit_files.append(unit_file)
 
-        sysctl_interact(args=["link", str(unit_file)])
+    def sysctl_run(action, args):
+        if args:
+            proc = text_run(["sudo", sysctl, action] + [str(arg) for arg in args])
+            log.write(proc.stdout + proc.stderr)
 
-        unit = unit_file.name
-        if unit in ["homelab.service", "homelab_backup.timer"]:
-            sysctl_interact(args=["enable", unit])
-        if unit.endswith(".timer"):
-            sysctl_interact(args=["start", unit])
+    # Authenticate once (prompting on the terminal if required), then act on all units
+    # at once, instead of authenticating each action on each unit.
+    run(["sudo", "--validate"], check=True)
+
+    units = [unit_file.name for unit_file in unit_files]
+    sysctl_run("link", unit_files)
+    sysctl_run(
+        "enable", [u for u in units if u in ["homelab.service", "homelab_backup.timer"]]
+    )
+    sysctl_run("start", [u for u in units if u.endswith(".timer")])
 
     print("Linking completed successfully.", file=log)
     print("All units were *enabled*, but only timers were also *started*.", file=log)
@@ -135,21 +102,43 @@ def cli_parse(choices) -> argparse.Namespace:
     return parser.parse_args()
 
 
+class _ChunkStream(io.RawIOBase):
+    """Unseekable, read-only file object over an iterable of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._chunk:
+            try:
+                self._chunk = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0  # EOF
+        n = min(len(b), len(self._chunk))
+        b[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+
 def get_home_ips():
     """Get all unique IPs from our DynDNS history."""
 
     container = _DOCKER.containers.get("ddns")
     # No `docker cp` equivalent in the Python API, tar magic is required...
-    bytes, _ = container.get_archive("/updater/data/updates.json")
-    archive_bytes = b"".join(bytes)
-    virtual_file = io.BytesIO(archive_bytes)
-
-    tar = tarfile.open(fileobj=virtual_file)
-    member = tar.getmember("updates.json")
-    file = tar.extractfile(member)
+    chunks, _ = container.get_archive("/updater/data/updates.json")
 
-    contents = file.read().decode("utf8")
-    updates = json.loads(contents)
+    # Read the archive as it arrives, without holding all of it in memory first:
+    with tarfile.open(fileobj=_ChunkStream(chunks), mode="r|") as tar:
+        for member in tar:
+            if member.name == "updates.json":
+                updates = json.load(tar.extractfile(member))
+                break
+        else:
+            raise KeyError("updates.json not found in archive.")
 
     ips = set()
     for record in updates["records"]:
@@ -161,13 +150,19 @@ def get_home_ips():
 
 def ipinfos(ips):
     """Fetches all ipinfo.io details for the passed IPs."""
+    if not ips:
+        return []
+
+    import ipinfo
+
     dir = Path(__file__).parent
     with open(dir / Path("ipinfo-api-token")) as f:
         access_token = f.read().strip()
 
     handler = ipinfo.getHandler(access_token)
 
-    return [handler.getDetails(ip).details for ip in ips]
+    # A single request for all IPs, instead of one round-trip each:
+    return list(handler.getBatchDetails(list(ips)).values())
 
 
 def outsiders(dump=True):
@@ -177,19 +172,19 @@ def outsiders(dump=True):
     inside_ips = get_home_ips()
 
     for n, line in enumerate(docker_logs("proxy")):
-        entry = json.loads(line)
+        entry = loads(line)
 
         timestamp = aware_timestamp(entry["ts"])
         if n == 0:
             log_start = timestamp.isoformat()
             start_delta = now() - timestamp
 
-        try:
-            ip, _ = entry["request"]["remote_addr"].split(":")
-        except KeyError:
+        remote_addr = entry.get("request", {}).get("remote_addr")
+        if remote_addr is None:
             # Not a server log line, perhaps a startup log line like
             # '{"level":"warn","ts":1615631067.0608304,"logger":"admin","msg":"admin endpoint disabled"}'
             continue
+        ip, _ = remote_addr.split(":")
         if ip in inside_ips:
             continue
         outside_ips.add(ip)
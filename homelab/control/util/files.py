@@ -1,24 +1,47 @@
+import os
+from functools import lru_cache
 from pathlib import Path
-from shlex import quote
+from shutil import which
 
 from control.util.log import LOGGER
-from control.util.procs import text_run
 
 PYTHON_PACKAGE_ROOT = Path(__file__).parent.parent
-LOGGER.debug(f"Python package root: {PYTHON_PACKAGE_ROOT}")
+LOGGER.debug("Python package root: %s", PYTHON_PACKAGE_ROOT)
 
 PYTHON_PROJECT_ROOT = PYTHON_PACKAGE_ROOT.parent
-LOGGER.debug(f"Python project root: {PYTHON_PROJECT_ROOT}")
+LOGGER.debug("Python project root: %s", PYTHON_PROJECT_ROOT)
 
 PROJECT_ROOT = PYTHON_PROJECT_ROOT.parent
-LOGGER.debug(f"Project root: {PROJECT_ROOT}")
+LOGGER.debug("Project root: %s", PROJECT_ROOT)
 
 
 def strip_last_suffix(path: Path) -> Path:
     return path.with_suffix("")
 
 
+@lru_cache(maxsize=None)
 def locate_executable(cmd) -> Path:
-    """Returns the absolute path to the passed command, searching `$PATH`."""
-    # `Path` doesn't strip trailing newline and would carry it along, so `strip`.
-    return Path(text_run(["which", quote(cmd)]).stdout.strip())
+    """Returns the absolute path to the passed command, searching `$PATH`.
+
+    Results are cached: should `$PATH` change, call `locate_executable.cache_clear()`.
+    """
+    # Searches in-process, no need to spawn `which`.
+    path = which(cmd)
+    if path is None:
+        raise FileNotFoundError(f"Executable '{cmd}' not found in $PATH.")
+    return Path(path)
+
+
+def walk(root):
+    """Recursively yields all `os.DirEntry` objects below `root`.
+
+    Entries carry their file type from the directory listing already, so checking
+    it does not cost another `stat` call, unlike for `Path.rglob` results.
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                yield entry
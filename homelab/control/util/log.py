@@ -10,21 +10,23 @@ def log_calls(as_level):
     """Decorator to log function calls with their entire signature."""
 
     def decorator(f):
+        sig = signature(f)  # Expensive, only do it once
+
         @wraps(f)
         def wrapper(*args, **kwargs):
-            sig = signature(f)
+            if not LOGGER.isEnabledFor(as_level):
+                return f(*args, **kwargs)
+
             binding = sig.bind(*args, **kwargs)
             LOGGER.log(
                 as_level,
-                "Calling: "
-                + f.__module__
-                + "."
-                + f.__qualname__
-                + " with "
-                + str(binding)
+                "Calling: %s.%s with %s",
+                f.__module__,
+                f.__qualname__,
+                binding,
             )
             res = f(*args, **kwargs)
-            LOGGER.log(as_level, "Call return: " + str(res))
+            LOGGER.log(as_level, "Call return: %s", res)
             return res
 
         return wrapper
@@ -1,5 +1,4 @@
 import time
-from datetime import datetime as dt
 from datetime import timedelta as td
 from functools import wraps
 from subprocess import CalledProcessError, run
@@ -49,27 +48,27 @@ def retry(
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            nonlocal backoff
-            start = dt.now()
+            # Each call starts over with the initial backoff:
+            sleep = backoff.total_seconds()
+            start = time.monotonic()  # Unaffected by system clock changes
             LOGGER.debug("Starting function call retries.")
             n = 1
             while True:
-                LOGGER.info(f"Running try number {n}.")
+                LOGGER.info("Running try number %s.", n)
                 try:
                     res = func(*args, **kwargs)
                     LOGGER.info("Call succeeded.")
                     return res
                 except on_exception:
-                    LOGGER.warning(f"Call failed (raised {on_exception}).")
+                    LOGGER.warning("Call failed (raised %s).", on_exception)
                     n += 1
-                    now = dt.now()
-                    delta = now - start
-                    if delta > timeout:
+                    elapsed = time.monotonic() - start
+                    if elapsed > timeout.total_seconds():
                         LOGGER.error("Timeout reached, exiting.")
                         raise
-                    LOGGER.info(f"Sleeping for {backoff}.")
-                    time.sleep(backoff.total_seconds())
-                    backoff *= 2  # exponential
+                    LOGGER.info("Sleeping for %s seconds.", sleep)
+                    time.sleep(sleep)
+                    sleep *= 2  # exponential
 
         return wrapper
 
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from sys import version_info
 
 if version_info >= (3, 9):
@@ -18,4 +18,4 @@ def now(tzinfo=_LOCAL_TZ):
 
 def aware_timestamp(utc_epoch, tzinfo=_LOCAL_TZ):
     """Turns a UTC Unix epoch timestamp into a timezone-aware datetime object."""
-    return datetime.utcfromtimestamp(utc_epoch).replace(tzinfo=tzinfo)
+    return datetime.fromtimestamp(utc_epoch, tz=timezone.utc).astimezone(tzinfo)
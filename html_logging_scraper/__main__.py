@@ -1,55 +1,59 @@
 #! /bin/env python3
 
 import json
+import os
 import random
-from functools import partial
+from hashlib import sha256
 from importlib.resources import open_text
-from smtplib import SMTP_SSL
+from pathlib import Path
 
-import requests
+# Heavier imports happen in the functions needing them: most invocations do not
+# fire at all and should exit as quickly as possible.
 
 
-def strings_similarity(*strings) -> float:
-    """Returns percentage of shared characters among all strings, based on position.
+def strings_fuzzy_equality(string, other, threshold=0.98) -> bool:
+    """Returns whether string similarity is above threshold.
 
-    Iterates over all given strings character-by-character. If all characters
-    in a position are equal, gain one point. Iteration stops with the shortest
-    string.
-    This really only works for long strings that differ in some characters, but
-    continue equally afterwards, like:
+    Similarity is the normalized Indel distance (insertions and deletions only).
+    As opposed to comparing characters position by position, it is not thrown off
+    by characters inserted somewhere, like:
         abcdefgh_1_jklmnop
-        abcdefgh_2_jklmnop
-    For more advanced comparisons, use Levenshtein distance.
-
-    Returns:
-        Number of points divided by the shortest string's length.
+        abcdefgh_12_jklmnop
     """
-    equal_characters = 0
-    for i, characters in enumerate(zip(*strings), start=1):
-        if len(set(characters)) == 1:  # all elements equal
-            equal_characters += 1
-    shortest_length = i
-    return equal_characters / shortest_length
-
-
-def strings_fuzzy_equality(*strings, threshold=0.98) -> bool:
-    """Returns whether string similarity is above threshold."""
-    return strings_similarity(*strings) >= threshold
-
-
-def send_mail(
-    smtp_server, smtp_username, smtp_password, from_address, to_address, subject, body
-):
-    with SMTP_SSL(smtp_server) as smtp_connection:
-        smtp_connection.login(smtp_username, smtp_password)
-        smtp_connection.sendmail(
-            from_address,
-            to_address,
-            (f"Subject: {subject}\n\n{body}"),
-        )
+    from rapidfuzz.distance import Indel
+
+    # With a cutoff, computation stops as soon as the threshold cannot be reached.
+    similarity = Indel.normalized_similarity(string, other, score_cutoff=threshold)
+    return similarity >= threshold
+
+
+def open_smtp(smtp_server, smtp_username, smtp_password):
+    """Returns a logged-in `SMTP_SSL` connection, to be reused for all mails."""
+    from smtplib import SMTP_SSL
+
+    smtp_connection = SMTP_SSL(smtp_server)
+    smtp_connection.login(smtp_username, smtp_password)
+    return smtp_connection
+
+
+def send_mail(smtp_connection, from_address, to_address, subject, body):
+    smtp_connection.sendmail(
+        from_address,
+        to_address,
+        (f"Subject: {subject}\n\n{body}"),
+    )
+
+
+def write_atomically(path: Path, text: str):
+    """Writes to a temporary file first, which then replaces `path` in one step."""
+    temporary_path = path.with_name(path.name + ".tmp")
+    temporary_path.write_text(text)
+    os.replace(temporary_path, path)
 
 
 def main():
+    import requests
+
     # 403 Forbidden if no User-Agent set,
     # copied from visiting the site on Windows/Firefox
     headers = {
@@ -65,36 +69,62 @@ def main():
     email_config = config["email"]
     url = config["website"]["url"]
 
-    mail = partial(
-        send_mail,
-        email_config["smtp_server"],
-        email_config["username"],
-        email_config["password"],
-        email_config["from_address"],
-        email_config["to_address"],
-    )
-
-    try:
-        current_page = requests.get("http://oijfrjoiroijr.com", headers=headers).text
-    except requests.ConnectionError as e:
-        mail(f"{url} is unreachable!", f"Got:\n\t{e}")
-        raise  # let it fail normally
-
-    logfile = "website.html"
+    smtp_connection = None
+
+    def mail(subject, body):
+        # Connect on the first mail only, then reuse the connection for all others:
+        nonlocal smtp_connection
+        if smtp_connection is None:
+            smtp_connection = open_smtp(
+                email_config["smtp_server"],
+                email_config["username"],
+                email_config["password"],
+            )
+        send_mail(
+            smtp_connection,
+            email_config["from_address"],
+            email_config["to_address"],
+            subject,
+            body,
+        )
 
     try:
-        with open(logfile) as file:
-            previous_page = file.read()
-    except FileNotFoundError:  # log file does not exist yet
-        pass  # to 'finally'
-    else:  # no exception: file exists
-        if not strings_fuzzy_equality(current_page, previous_page):
-            pass  # TODO: only email in this block; for debugging, always email
-        mail("Watched website changed significantly!", f"Check it out: {url}")
+        try:
+            current_page = requests.get(
+                "http://oijfrjoiroijr.com", headers=headers
+            ).text
+        except requests.ConnectionError as e:
+            mail(f"{url} is unreachable!", f"Got:\n\t{e}")
+            raise  # let it fail normally
+
+        logfile = Path("website.html")
+        digestfile = Path("website.html.sha256")
+        current_digest = sha256(current_page.encode("utf8")).hexdigest()
+
+        try:
+            previous_digest = digestfile.read_text()
+        except FileNotFoundError:  # not logged yet, or without digest (older runs)
+            previous_digest = None
+
+        try:
+            # Identical pages need no closer look, sparing reading the previous one:
+            if current_digest != previous_digest:
+                previous_page = logfile.read_text()
+                if not strings_fuzzy_equality(current_page, previous_page):
+                    pass  # TODO: only email in this block; for debugging, always email
+        except FileNotFoundError:  # log file does not exist yet
+            pass
+        else:  # no exception: file exists
+            mail("Watched website changed significantly!", f"Check it out: {url}")
+        finally:
+            # Log current page and be done; an unchanged page is logged already.
+            if current_digest != previous_digest:
+                # Digest last: should writing fail midway, the next run compares.
+                write_atomically(logfile, current_page)
+                write_atomically(digestfile, current_digest)
     finally:
-        # Log current page and be done
-        with open(logfile, "w") as file:
-            file.write(current_page)
+        if smtp_connection is not None:
+            smtp_connection.quit()
 
 
 if __name__ == "__main__":
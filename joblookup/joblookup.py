@@ -3,13 +3,6 @@ import datetime
 import os
 import re
 import sys
-import time
-
-import notify2
-from bs4 import BeautifulSoup
-# Selenium requires geckodriver, cf. https://stackoverflow.com/q/40208051/11477374
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
 
 # Assemble path so script can be called from outside its location via symlink
 base_dir = os.path.dirname(os.path.realpath(__file__))
@@ -26,6 +19,12 @@ filepaths = {
     "geckolog": os.path.join(base_dir, "geckodriver.log")
 }
 
+# Number of jobs as found on the website. The page text might contain other
+# whitespace than plain spaces.
+job_count_pattern = re.compile(r"(\d+)\svon\s\d+\sStellenangebote")
+# Number of jobs in our own log, which we wrote with plain spaces
+previous_job_count_pattern = re.compile(r"Found (\d+) ")
+
 # Provide ability to get URL from command line argument
 try:
     # Scrape using the supplied URL
@@ -35,27 +34,43 @@ except IndexError:
     with open(filepaths["url"], "r") as url_file:
         url = url_file.readline()
 
+# Heavy imports only after cheap setup succeeded, so that fails quickly
+# Selenium requires geckodriver, cf. https://stackoverflow.com/q/40208051/11477374
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+
 options = Options()
 options.headless = True  # Do not open window/display
 
 # Use Selenium to have JavaScript support
 driver = webdriver.Firefox(options=options, service_log_path=filepaths["geckolog"])
 driver.get(url)
-time.sleep(5)  # Give it time to actually load
-html_source = driver.page_source  # Extract source code
-# Make it slightly more readable
-html_text = BeautifulSoup(html_source, "html.parser").text
+try:
+    # Give it time to actually load, but no longer than needed
+    WebDriverWait(driver, timeout=15).until(
+        lambda driver: "Stellenangebote" in driver.page_source
+    )
+except TimeoutException:
+    pass  # Carry on, the job count just won't be found
+# Rendered text as displayed, straight from the browser's live DOM, no need to parse
+# the source code ourselves
+html_text = driver.find_element(By.TAG_NAME, "body").text
 
 # Store a log for debugging the website content
 with open(filepaths["website"], "w") as text_file:
     text_file.write(html_text)
 
-match = re.search(r"(\d+)\svon\s\d+\sStellenangebote", html_text)
+match = job_count_pattern.search(html_text)
 
 if match:
     number_of_jobs = int(match.group(1))
     base_message = "Found " + str(number_of_jobs) + " jobs for: " + url
 
+    import notify2  # Only needed if there is something to notify about
+
     notify2.init("Job Search Script")
     notification = notify2.Notification("Job Search",
                                         base_message,
@@ -68,15 +83,20 @@ if match:
     # If so, get its last line and extract the number of jobs hit we got there.
     # The end goal is to increase the notification's urgency to CRITICAL if the number increased, aka a new job was listed.
     if os.path.isfile(filepaths["searches"]):
-        with open(filepaths["searches"], "r") as logfile:
-            current_line = 0
-            for line in logfile:
-                if line.strip():  # Ignore whitespace/empty lines
-                    current_line = line
-            last_line = current_line
-
-            prev_search_match = re.search(r"Found\s(\d+)\s", last_line)
-            prev_number_of_jobs = int(prev_search_match.group(1))
+        # Only the last entry is of interest, so only read the end of the ever-growing
+        # log. Should the entry not fit into that, read it all after all.
+        tail_size = 4096
+        with open(filepaths["searches"], "rb") as logfile:
+            size = logfile.seek(0, os.SEEK_END)
+            logfile.seek(max(0, size - tail_size))
+            tail = logfile.read().decode("utf8", "replace")
+            prev_numbers_of_jobs = previous_job_count_pattern.findall(tail)
+            if not prev_numbers_of_jobs and size > tail_size:
+                logfile.seek(0)
+                tail = logfile.read().decode("utf8", "replace")
+                prev_numbers_of_jobs = previous_job_count_pattern.findall(tail)
+
+            prev_number_of_jobs = int(prev_numbers_of_jobs[-1])
             if number_of_jobs > prev_number_of_jobs:
                 # 0, 1, 2 for low, normal, critical
                 # Critical notifications do not expire
@@ -85,7 +105,8 @@ if match:
 
     # Finally, log what we have done with a timestamp
     with open(filepaths["searches"], "a") as logfile:
-        logfile.write(str(datetime.datetime.now().strftime(
-            "[%Y-%m-%d %H:%M:%S] ")) + base_message)
+        # Same as "%Y-%m-%d %H:%M:%S", without parsing a format string
+        timestamp = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        logfile.write(f"[{timestamp}] {base_message}\n")
 
     notification.show()
@@ -1,5 +1,4 @@
 import logging
-import random
 from collections import namedtuple
 from dataclasses import dataclass
 
@@ -7,6 +6,16 @@ import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 
+try:
+    from numba import njit, prange
+except ImportError:  # Runs as plain, much slower, Python then
+    def njit(*args, **kwargs):
+        if args:  # Used bare, as `@njit`
+            return args[0]
+        return lambda function: function
+
+    prange = range
+
 logging.basicConfig(
     filename="monopoly.log",
     filemode="w",  # over_w_rite file each time
@@ -38,23 +47,98 @@ class Chance_Card(Card):
     category = "chance"
 
 
-def roll_dice(no_of_dice=2, lower=1, upper=6):
-    """Roll specified number of die with specified upper and lower bounds."""
-    rolls = [random.randint(lower, upper) for _ in range(no_of_dice)]
-    return {
-        "sum": sum(rolls),
-        "individual": rolls,
-        "all_rolls_equal": len(set(rolls)) <= 1
-    }
-
-
-def draw_card(cards, from_position=0):
-    """Take item from specified position of list
-    (from top if from_position=0) and append it to end of list again.
+def streaks(flags):
+    """For each element, the number of consecutive truthy elements ending there,
+    along the last axis.
+    """
+    indices = np.arange(flags.shape[-1])
+    # Index of the most recent falsey element, for each element:
+    last_false = np.maximum.accumulate(np.where(flags, -1, indices), axis=-1)
+    return indices - last_false
+
+
+# Effects of cards on the position, as codes for the simulation:
+NO_MOVE, SHIFT, NEW_POSITION, ADVANCE_TO_NEAREST = range(4)
+
+
+def encode(card, advance_categories):
+    """Effect of a card on the position, and the effect's argument."""
+    if card.position_shift:
+        return SHIFT, card.position_shift
+    elif card.new_position is not None:  # new position 0 for 'go' evaluates falsey otherwise
+        return NEW_POSITION, card.new_position
+    elif card.advance_to_nearest:
+        return ADVANCE_TO_NEAREST, advance_categories.index(card.advance_to_nearest)
+    return NO_MOVE, 0
+
+
+@njit(cache=True)  # Compiling takes longer than simulating; only do so once
+def simulate(
+    roll_sums, to_jail, place_decks, deck_sizes, effects, arguments, nearest,
+    start, jail, go_to_jail
+):
+    """Play a game of the given rolls, returning the visits of each place.
+
+    Places with a deck of cards to draw from are marked in `place_decks` (-1 for
+    none). Each deck is drawn from in order, starting over at the end, as if drawn
+    cards were put back at the bottom. A card's effect on the position and its
+    argument (the shift, new position or row of `nearest`) are parallel arrays,
+    indexed by deck and card.
     """
-    drawn_card = cards.pop(from_position)
-    cards.append(drawn_card)
-    return drawn_card, cards
+    no_of_places = len(place_decks)
+    visited = np.zeros(no_of_places, dtype=np.int64)
+    cursors = np.zeros(len(deck_sizes), dtype=np.int64)
+
+    position = start
+    for n in range(len(roll_sums)):
+        position += roll_sums[n]
+
+        if position >= no_of_places:  # Wrap around
+            position -= no_of_places
+
+        if to_jail[n] or position == go_to_jail:
+            position = jail
+
+        # In order, since a card can move onto a place of a later deck:
+        for deck in range(len(deck_sizes)):
+            if place_decks[position] != deck:
+                continue
+
+            card = cursors[deck]
+            cursors[deck] = (card + 1) % deck_sizes[deck]
+
+            effect = effects[deck, card]
+            if effect == SHIFT:
+                position += arguments[deck, card]
+            elif effect == NEW_POSITION:
+                position = arguments[deck, card]
+            elif effect == ADVANCE_TO_NEAREST:
+                position = nearest[arguments[deck, card], position]
+
+        visited[position] += 1
+    return visited
+
+
+@njit(parallel=True, cache=True)
+def simulate_games(
+    roll_sums, to_jail, rolls_per_game, place_decks, deck_sizes, effects,
+    arguments, nearest, start, jail, go_to_jail
+):
+    """Play independent games in parallel, returning the visits summed over all.
+
+    Games are along the first axis of the rolls and of the (differently shuffled)
+    card decks, see `simulate`. Each game only plays the first of its rolls, as
+    many as given in `rolls_per_game`.
+    """
+    visited = np.zeros((len(roll_sums), len(place_decks)), dtype=np.int64)
+    for game in prange(len(roll_sums)):
+        played = rolls_per_game[game]
+        visited[game] = simulate(
+            roll_sums[game, :played], to_jail[game, :played],
+            place_decks, deck_sizes, effects[game], arguments[game], nearest,
+            start, jail, go_to_jail
+        )
+    return visited.sum(axis=0)
 
 
 LOCALE = "en_US"
@@ -328,76 +412,77 @@ card_sets = {
 }
 
 
-board["Visited"] = 0  # Initialize column of visited places
-
-position = None  # Initially, we are 'nowhere'
-equal_rolls_in_a_row = 0
+no_of_rolls = 10**4
+# Games are independent of each other, so they are played at the same time
+# (spread over the cores by `prange`). Their number is fixed, so results do not
+# depend on the machine: every game starts at 'Go', so shorter games skew visits.
+no_of_games = 8
+rolls_per_game = np.full(no_of_games, no_of_rolls // no_of_games)
+rolls_per_game[:no_of_rolls % no_of_games] += 1  # Spread the remainder
 
 card_set = card_sets[LOCALE]
 
-# Shuffle once, then cycle through without shuffling again after drawing:
-for category in card_set:
-    random.shuffle(card_set[category])
-
-for _ in range(10**4):
-
-    if position is None:
-        position = 0
-        logging.debug(f"Starting game from '{board['Name'][position]}'.")
-        continue
-
-    roll = roll_dice()
-    logging.debug(f"Rolled total of {roll['sum']} from {roll['individual']}.")
-    position += roll["sum"]
-
-    if position >= len(board):  # Wrap around
-        position -= len(board)
-
-    if roll["all_rolls_equal"]:
-        equal_rolls_in_a_row += 1
-        # This can only happen within this if-block:
-        if equal_rolls_in_a_row >= 3:
-            logging.debug("Going to jail for three all-equal rolls in a row.")
-            position = positions["jail"]
-            equal_rolls_in_a_row = 0  # Reset
-    else:
-        equal_rolls_in_a_row = 0  # Reset back since streak now broken
-
-    if position is positions["go to jail"]:
-        logging.debug("Hit 'Go To Jail'.")
-        position = positions["jail"]
-
-    for category in card_set:
-        if position in positions[category]:
-            card, card_set[category] = draw_card(card_set[category])
-
-            logging.debug(
-                f"Hit a '{category.title()}' field at {position} "
-                f"and drew '{card.text}'."
+rng = np.random.default_rng()
+
+# Card decks as parallel arrays, only the effects on the position are simulated:
+advance_categories = sorted({
+    card.advance_to_nearest
+    for cards in card_set.values()
+    for card in cards
+    if card.advance_to_nearest
+})
+deck_sizes = np.array([len(cards) for cards in card_set.values()])
+shape = (no_of_games, len(card_set), deck_sizes.max())
+effects = np.full(shape, NO_MOVE, dtype=np.int8)
+arguments = np.zeros(shape, dtype=np.int16)
+
+# Shuffle once per game, then cycle through without shuffling again after drawing:
+for game in range(no_of_games):
+    for deck, cards in enumerate(card_set.values()):
+        for n, index in enumerate(rng.permutation(len(cards))):
+            effects[game, deck, n], arguments[game, deck, n] = encode(
+                cards[index], advance_categories
             )
 
-            if card.position_shift:
-                position += card.position_shift
-            elif card.new_position is not None:  # new position 0 for 'go' evaluates falsey otherwise
-                position = card.new_position
-            elif card.advance_to_nearest:
-                position = min(
-                    positions[card.advance_to_nearest],
-                    key=lambda x: abs(x - position)
-                )
-            elif card.money_change:
-                logging.debug(
-                    f"Changing player money by '{card.money_change}'. "
-                    "(Not implemented yet)"
-                )
-            elif card.get_out_of_jail:
-                logging.debug("Get ouf of Jail card not implemented yet.")
-            else:
-                logging.warning("No matching card attribute found.")
-
-    logging.debug(f"Roll ended on position '{position}'.")
-    # This does not seem to impact performance
-    board.at[position, 'Visited'] += 1
+place_decks = np.full(len(board), -1, dtype=np.int8)
+for deck, category in enumerate(card_set):
+    place_decks[positions[category]] = deck
+
+# Nearest place of each category to advance to, for every place on the board:
+nearest = np.array([
+    [
+        min(positions[category], key=lambda x: abs(x - position))
+        for position in range(len(board))
+    ]
+    for category in advance_categories
+], dtype=np.int16)
+
+# Everything not depending on the current position is computed upfront, for all
+# rolls of all games at once.
+no_of_dice = 2  # Six-sided
+rolls = rng.integers(
+    1, 7, size=(no_of_games, rolls_per_game.max(), no_of_dice), dtype=np.int8
+)
+# Games with fewer rolls leave the end of their row unplayed:
+played = np.arange(rolls.shape[1]) < rolls_per_game[:, np.newaxis]
+roll_sums = rolls.sum(axis=-1)  # Sums in the default integer type, no overflow
+all_rolls_equal = (rolls == rolls[..., :1]).all(axis=-1)
+# Every third all-equal roll in a row leads to jail, then the streak starts over:
+equal_rolls_in_a_row = streaks(all_rolls_equal)
+to_jail = all_rolls_equal & (equal_rolls_in_a_row % 3 == 0) & played
+
+logging.debug(
+    f"Starting {no_of_games} game(s) from '{board['Name'][positions['go']]}'."
+)
+
+board["Visited"] = simulate_games(
+    roll_sums, to_jail, rolls_per_game, place_decks, deck_sizes, effects,
+    arguments, nearest, positions["go"], positions["jail"], positions["go to jail"]
+)
+logging.debug(
+    f"Rolled {rolls_per_game.sum()} times, going to jail {to_jail.sum()} times "
+    "for three all-equal rolls in a row."
+)
 
 logging.debug(board)
 
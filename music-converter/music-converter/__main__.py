@@ -5,19 +5,22 @@
 Copies metadata and (cover) images, as well as embedding those images into
 the music files' metadata.
 
-Based on `ffmpeg` (called via `subprocess` via `pydub`).
+Based on `ffmpeg` (called via `subprocess`).
 """
 
 import argparse
 import logging
-from collections import namedtuple
+import os
+import pickle
+import subprocess
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from shutil import copy2 as copy  # copy2 also copies metadata
+from shutil import copy2, copyfile  # copy2 also copies metadata
 
 import fleep  # get file type from binary header
 from mutagen.id3 import APIC, ID3
-from pydub import AudioSegment  # just a wrapper for ffmpeg
-from pydub.utils import mediainfo  # metadata utility
 
 
 def read_bytes(file, no_of_bytes=128):
@@ -37,14 +40,90 @@ def fleepget(source):
     return fleep.get(read_bytes(source))
 
 
-def copy_if_not_exist(src, dest):
+# For these unambiguous suffixes, the file type is taken for granted, sparing
+# opening the file and sniffing its binary header:
+known_suffixes = {
+    ".flac": fleep.Info(["audio"], ["flac"], ["audio/flac"]),
+    ".mp3": fleep.Info(["audio"], ["mp3"], ["audio/mpeg"]),
+    ".ogg": fleep.Info(["audio"], ["ogg"], ["audio/ogg"]),
+    ".m4a": fleep.Info(["audio"], ["m4a"], ["audio/mp4"]),
+    ".wav": fleep.Info(["audio"], ["wav"], ["audio/wav"]),
+    ".jpg": fleep.Info(["raster-image"], ["jpg"], ["image/jpeg"]),
+    ".jpeg": fleep.Info(["raster-image"], ["jpg"], ["image/jpeg"]),
+    ".png": fleep.Info(["raster-image"], ["png"], ["image/png"]),
+}
+
+
+# Sniffed headers of previous runs, by path and the file's modification time and size:
+headers_cache = Path.home() / ".cache" / "music-converter" / "headers.pickle"
+
+
+def load_headers():
+    try:
+        with headers_cache.open("rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):  # Missing or unusable
+        return {}
+
+
+def save_headers(headers):
+    headers_cache.parent.mkdir(parents=True, exist_ok=True)
+    with headers_cache.open("wb") as f:
+        pickle.dump(headers, f)
+
+
+def file_info(entry, previous_headers, headers):
+    """File type info, from the suffix if well-known, else from the binary header.
+
+    Sniffed headers are looked up in, and recorded to, the header caches first.
+    Reruns over the same tree thus only `stat` unchanged files instead of opening
+    and reading them.
+    """
+    source = Path(entry.path)
+    info = known_suffixes.get(source.suffix.lower())
+    if info is None:
+        stat = entry.stat()
+        key = (entry.path, stat.st_mtime_ns, stat.st_size)
+        info = previous_headers.get(key)
+        if info is None:
+            info = fleepget(source)
+        headers[key] = info
+    return info
+
+
+def walk(root):
+    """Recursively yields all `os.DirEntry` objects below `root`, dirs first."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                yield entry
+
+
+def copy_if_not_exist(src, dest, preserve=True):
     if not dest.is_file():
-        copy(src, dest)  # Copy over as-is
+        # Copy over as-is. Without preserving metadata, only the contents are copied
+        # (in-kernel where possible), sparing the `copystat` calls.
+        (copy2 if preserve else copyfile)(src, dest)
         logging.info(f"Copying succeeded.")
     else:
         logging.info(f"Copying did not succeed: target existed.")
 
 
+def read_cover(directory: Path, record):
+    """Cover image contents of the record in `directory`, `None` if there is none."""
+    try:
+        with open(directory / Path("cover.jpg"), "rb") as f:
+            cover = f.read()
+            logging.info(f"Cover image found for {record=}")
+    except FileNotFoundError:
+        logging.warn(f"No cover image found for {record=}")
+        cover = None
+    return cover
+
+
 def embed_cover(cover: bytes, file: Path):
     audio = ID3(file)
     audio["APIC"] = APIC(
@@ -53,6 +132,84 @@ def embed_cover(cover: bytes, file: Path):
     audio.save()
 
 
+def can_stream_copy(source: Path):
+    """Whether the audio stream can be copied as-is: it is already in the target
+    format, and no bitrate was requested explicitly.
+    """
+    return args.bitrate is None and source.suffix.lower() == target_suffix.lower()
+
+
+def convert(jobs):
+    """Convert audio files to the target format, embedding covers if given.
+
+    `jobs` are `(source, destination, cover)` tuples, all handled by a single ffmpeg
+    process. Starting ffmpeg and its codecs only once per batch instead of per file
+    matters for libraries with many short tracks. `cover` is a future of the cover
+    image contents, or `None`.
+
+    If ffmpeg fails, the batch's files are converted again one per process, so a
+    single broken file does not take the others down with it.
+    """
+    # A single ffmpeg process reads, decodes, encodes and writes; the audio
+    # never passes through Python.
+    cmd = [
+        "ffmpeg",
+        "-nostdin",  # Never wait for interactive input
+        "-loglevel",
+        "error",
+        "-n",  # Never overwrite
+    ]
+    for source, _, _ in jobs:
+        cmd += ["-i", str(source)]
+    for n, (source, destination, _) in enumerate(jobs):
+        if can_stream_copy(source):
+            # Re-encoding lossy audio only loses quality, and takes much longer:
+            codec = ["-codec:a", "copy"]
+        else:
+            codec = ["-b:a", bitrate + "k"]  # 320k bitrate mp3 leads to large files
+        # Output options apply to the output file following them:
+        cmd += [
+            "-map",
+            f"{n}:a",  # Only audio, the cover is embedded separately
+            "-map_metadata",
+            str(n),  # Copy over metadata (tags)
+            *codec,
+            str(destination),  # Format follows from the extension
+        ]
+    # With `-n`, ffmpeg also fails on existing outputs; these must never be removed.
+    existed = {destination for _, destination, _ in jobs if destination.exists()}
+    try:
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError:
+        # ffmpeg leaves behind what it wrote so far, including truncated files.
+        # Existing targets are skipped on the next run, so none of these may stay.
+        for _, destination, _ in jobs:
+            if destination not in existed:
+                destination.unlink(missing_ok=True)
+        if len(jobs) == 1:
+            raise
+        sources = [str(source) for source, _, _ in jobs]
+        logging.warning(f"Batch conversion failed, retrying file by file: {sources}")
+        failures = []
+        for job in jobs:
+            try:
+                convert([job])
+            except subprocess.CalledProcessError as e:
+                failures.append(e)
+        if failures:
+            raise failures[0]
+        return
+
+    for _, destination, cover in jobs:
+        logging.info(f"Conversion succeeded: {destination}")
+        if cover is not None:
+            cover = cover.result()  # Long read by now, while ffmpeg was running
+        if cover is not None and target.lower() == "mp3":
+            # Only use mp3 to ensure ID3 works.
+            logging.info(f"Embedding cover image into audio file: {destination}")
+            embed_cover(cover, destination)
+
+
 parser = argparse.ArgumentParser(
     formatter_class=argparse.ArgumentDefaultsHelpFormatter, description=__doc__
 )
@@ -79,10 +236,18 @@ parser.add_argument(
 parser.add_argument(
     "-b",
     "--bitrate",
-    help="Target bitrate in kilobytes.",
-    default="128",
+    help="Target bitrate in kilobytes [128 if not given; files already in the"
+    " target format are then copied without re-encoding].",
+    default=None,
     choices=["128", "320"],
 )
+parser.add_argument(
+    "-j",
+    "--jobs",
+    help="Number of conversions to run at the same time.",
+    type=int,
+    default=os.cpu_count(),
+)
 parser.add_argument(
     "-v",
     "--verbose",
@@ -92,6 +257,8 @@ parser.add_argument(
 )
 
 args = parser.parse_args()
+if args.jobs < 1:
+    parser.error(f"argument -j/--jobs: must be at least 1, got {args.jobs}")
 
 verbosity_to_log_levels = {
     0: "WARN",
@@ -104,59 +271,74 @@ logging.basicConfig(level=verbosity_to_log_levels[args.verbose])
 source_root = Path(args.source)
 destination_root = Path(args.destination)
 
-bitrate = args.bitrate
+bitrate = args.bitrate or "128"
 
 destination_root.mkdir(exist_ok=True)
 
 extensions = args.extensions
 target = args.target
+target_suffix = "." + target
 logging.info(f"Extensions to be converted are: {extensions}")
 logging.info(f"They are going to be converted to: {target}")
 
-ArtistAlbum = namedtuple("ArtistAlbum", ["artist", "album"])
+# Maximum number of files converted per ffmpeg process. Before ffmpeg 7, one
+# process encodes its outputs one after another, so batches are kept small enough
+# to spread an album over several processes (and cores).
+batch_size = 4
 
 
 def main():
-    covers = {}  # Map records to covers
+    # Map records to covers. Records are (artist, album) tuples of interned strings:
+    # the same artist and album occur for many files.
+    covers = {}
+    previous_headers = load_headers()
+    headers = {}  # Only headers of files still around are kept for the next run
+    # Conversions are independent of each other and the actual work happens in
+    # ffmpeg subprocesses, so threads suffice to keep all cores busy. The walk
+    # carries on while conversions run.
+    executor = ThreadPoolExecutor(max_workers=args.jobs)
+    # Covers are read in the background as well, not holding up the walk:
+    cover_readers = ThreadPoolExecutor(max_workers=4)
+    conversions = []
+    batches = defaultdict(list)  # Pending conversions, by source directory
+    planned = set()  # Destinations of all pending conversions
+    # Entry paths all start with the root and a separator; cutting these off is
+    # much cheaper than `Path.relative_to`.
+    root_length = len(str(source_root)) + 1
     # Visit all subdirectories recursively.
-    for source in source_root.rglob("*"):
+    for entry in walk(source_root):
+        source = Path(entry.path)
         # Mirror found directory structure relative to the import root directory
         # over to the export directory, also relative.
-        relative = source.relative_to(source_root)
+        relative = entry.path[root_length:]
 
         destination = destination_root.joinpath(relative)
 
         parts = source.parts
-        if source.is_dir():
+        if entry.is_dir():
             destination.mkdir(parents=True, exist_ok=True)
             logging.info(f"Created directory: {destination}")
 
-            record = ArtistAlbum(parts[-2], parts[-1])
-            try:
-                with open(source / Path("cover.jpg"), "rb") as f:
-                    cover = f.read()
-                    logging.info(f"Cover image found for {record=}")
-            except FileNotFoundError:
-                logging.warn(f"No cover image found for {record=}")
-                cover = None
-            finally:
-                # Have to store this for later since search is not depth-first,
-                # e.g. when a cover is saved, the next encountered item might be
-                # of a different album/artist; embedding the cover into it would
-                # be wrong.
-                covers[record] = cover
-
-        if not source.is_file():
+            record = (sys.intern(parts[-2]), sys.intern(parts[-1]))
+            # Have to store this for later since search is not depth-first,
+            # e.g. when a cover is saved, the next encountered item might be
+            # of a different album/artist; embedding the cover into it would
+            # be wrong.
+            covers[record] = cover_readers.submit(read_cover, source, record)
+
+        if not entry.is_file():
             continue
         logging.info(f"Found file to be processed: {source}")
 
-        record = ArtistAlbum(parts[-3], parts[-2])  # Last part is music file
+        # Last part is music file
+        record = (sys.intern(parts[-3]), sys.intern(parts[-2]))
         # Load from (hopefully previously) encountered, correct cover image:
         cover = covers.get(record)
 
-        header = fleepget(source)  # Binary file header with file metainfo
+        header = file_info(entry, previous_headers, headers)  # File type metainfo
+        types = header.type
 
-        if header.type_matches("audio"):
+        if "audio" in types:
             logging.info("Detected audio file.")
             # File extension we're dealing with (returned without leading period).
             ext = header.extension[0].lower()
@@ -167,41 +349,45 @@ def main():
                     " conversion candidates, starting conversion."
                 )
                 # Change extension, else we get e.g. "file.flac" when it's actually an mp3.
-                destination = destination.with_suffix("." + target)
+                destination = destination.with_suffix(target_suffix)
                 logging.info(f"Target audio file is: {destination}")
 
                 if destination.is_file():
                     logging.info("Conversion did not succeed: target existed.")
+                elif destination in planned:
+                    # E.g. "a.flac" and "a.wav" both map to "a.mp3":
+                    logging.warning(f"Conversion skipped: target already planned.")
                 else:
-                    AudioSegment.from_file(source).export(
-                        destination,
-                        format=target,
-                        # Copy over metadata.
-                        # ffmpeg does this automatically without 'map_metadata' nowadays,
-                        # but even with "-map_metadata 0" as the value to the "parameters" key,
-                        # this doesn't work for PyDub.
-                        # Return empty dict if key not found.
-                        tags=mediainfo(source).get("TAG", {}),
-                        bitrate=bitrate + "k",  # 320k bitrate mp3 leads to large files
-                    )
-                    logging.info("Conversion succeeded.")
-                    if cover is not None and target.lower() == "mp3":
-                        # Only use mp3 to ensure ID3 works.
-                        logging.info("Embedding cover image into audio file.")
-                        embed_cover(cover, destination)
+                    planned.add(destination)
+                    batch = batches[source.parent]
+                    batch.append((source, destination, cover))
+                    if len(batch) == batch_size:
+                        conversions.append(
+                            executor.submit(convert, batches.pop(source.parent))
+                        )
             else:  # Audio file, but not to be converted.
                 logging.info(
                     "Audio file is not a candidate for conversion,"
                     f" starting copy process to: {destination}"
                 )
                 copy_if_not_exist(source, destination)
-        elif header.type_matches("raster-image"):
+        elif "raster-image" in types:
             # Album covers (jpg, png, ...)
             logging.info(f"File is a raster image (album art): {destination}")
-            copy_if_not_exist(source, destination)
+            copy_if_not_exist(source, destination, preserve=False)
         else:
             logging.warning(f"Source item fell through (no criteria met): {source}")
 
+    for batch in batches.values():  # Leftovers
+        conversions.append(executor.submit(convert, batch))
+
+    save_headers(headers)
+
+    # Wait for all conversions, raising any of their errors:
+    with executor, cover_readers:
+        for conversion in conversions:
+            conversion.result()
+
 
 if __name__ == "__main__":
     main()
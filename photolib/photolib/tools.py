@@ -4,6 +4,7 @@ from __future__ import annotations  # https://stackoverflow.com/q/33533148/11477
 
 import logging
 import mimetypes
+import os
 from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import IntEnum
@@ -335,10 +336,22 @@ class Library:
                 else:
                     logging.debug(f"Cleared {attr} cache.")
 
+    @staticmethod
+    def _iter_files(root: Path) -> Iterator[File]:
+        """Recursively yields all files below `root`."""
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():  # Only `stat`s symlinks, like `is_file`
+                        yield File(entry.path)
+
     @cached_property
     def files(self) -> list[File]:
         logging.info("Fetching current files...")
-        return sorted(File(item) for item in self.root.rglob("*") if item.is_file())
+        return sorted(self._iter_files(self.root))
 
     @cached_property
     def clusters(self) -> dict[File, list[str]]: